@@ -1,21 +1,34 @@
 import logging
+import logging.handlers
 import argparse
+import queue
+import sys
+
+from utils import BufferedFileHandler
+
+# Log records are handed to background QueueListeners so worker and IRC
+# threads never block on file writes.
 
 # --- Main moderation/chat logs to chat_log.txt ---
+chat_log_queue = queue.SimpleQueue()
+chat_handler = BufferedFileHandler("chat_log.txt")
+chat_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
 logging.basicConfig(
-    filename="chat_log.txt",
     level=logging.INFO,
-    format="%(asctime)s %(message)s",
+    handlers=[logging.handlers.QueueHandler(chat_log_queue)],
 )
 
 # --- All OpenAI, HTTPX, and HTTPCore logs to api_log.txt ---
-api_logger = logging.getLogger("api_logger")
-api_logger.setLevel(logging.INFO)
-api_handler = logging.FileHandler("api_log.txt")
+api_log_queue = queue.SimpleQueue()
+api_handler = BufferedFileHandler("api_log.txt")
 api_handler.setFormatter(
     logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
 )
-api_logger.addHandler(api_handler)
+api_queue_handler = logging.handlers.QueueHandler(api_log_queue)
+
+api_logger = logging.getLogger("api_logger")
+api_logger.setLevel(logging.INFO)
+api_logger.addHandler(api_queue_handler)
 
 for log_name in ["openai", "httpx", "httpcore"]:
     lib_logger = logging.getLogger(log_name)
@@ -25,11 +38,32 @@ for log_name in ["openai", "httpx", "httpcore"]:
     lib_logger.propagate = False
     # Set desired log level
     lib_logger.setLevel(logging.INFO)
-    # Add the api_log.txt handler
-    lib_logger.addHandler(api_handler)
+    # Route through the api_log.txt queue
+    lib_logger.addHandler(api_queue_handler)
+
+# --- Moderation console output, printed by a background listener ---
+console_log_queue = queue.SimpleQueue()
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(logging.Formatter("%(message)s"))
+moderation_logger = logging.getLogger("moderation")
+moderation_logger.setLevel(logging.INFO)
+# Console only; do not also copy these lines into chat_log.txt
+moderation_logger.propagate = False
+moderation_logger.addHandler(logging.handlers.QueueHandler(console_log_queue))
+
+log_listeners = [
+    logging.handlers.QueueListener(
+        chat_log_queue, chat_handler, respect_handler_level=True
+    ),
+    logging.handlers.QueueListener(
+        api_log_queue, api_handler, respect_handler_level=True
+    ),
+    logging.handlers.QueueListener(
+        console_log_queue, console_handler, respect_handler_level=True
+    ),
+]
 
 import threading
-import sys
 
 from twitch_auth import TwitchOAuthTokenManager
 from irc_client import run_irc_forever
@@ -39,16 +73,43 @@ from moderation import (
     run_worker,
     loss_report,
     configure_limits,
+    new_run_queue,
 )
 from token_utils import TokenBucket
-from utils import set_verbosity, load_config
+from utils import set_verbosity, load_config, BotConfig
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, DefaultHttpxClient
 except ImportError:
     print("Please install openai: pip install openai")
     sys.exit(1)
 
+# How long to wait for batch_worker's final flush on shutdown; run_worker gets
+# this much on top of moderation_timeout to finish its last batches.
+SHUTDOWN_TIMEOUT = 5
+
+
+def build_openai_http_client():
+    """Return one long-lived pooled HTTP client shared by all OpenAI calls.
+
+    HTTP/2 is used when the ``h2`` package is installed so concurrent
+    moderation workers multiplex over a single connection. Returns ``None``
+    (the OpenAI default client) if ``httpx`` cannot be imported.
+    """
+    try:
+        import httpx
+    except ImportError:
+        print(
+            "[BOT] httpx not found; using the default OpenAI HTTP client. "
+            "Install it for connection pooling: pip install httpx"
+        )
+        return None
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+    try:
+        return DefaultHttpxClient(http2=True, limits=limits)
+    except ImportError:
+        return DefaultHttpxClient(limits=limits)
+
 
 def main():
     parser = argparse.ArgumentParser(description="ChatGPT Twitch moderation bot")
@@ -64,42 +125,43 @@ def main():
     config = load_config()
 
     # --- Twitch/OpenAI setup ---
-    twitch = config["twitch"]
-    api_key = config["api_key"]
-    assistant_id = config["assistant_id"]
-    batch_interval = config.get("batch_interval", 2)
-    tokens_per_minute = config.get("tokens_per_minute", 20000)
-    moderation_timeout = config.get("moderation_timeout", 60)
-    max_openai_content_size = config.get("max_openai_content_size", 256000)
-    max_rate_limit_retries = config.get("max_rate_limit_retries", 3)
-    use_stream = config.get("use_stream", False)
-    channel = twitch["channel"]
+    settings = BotConfig.from_dict(config)
 
     # --- Token manager ---
     token_manager = TwitchOAuthTokenManager(
-        client_id=twitch["client_id"], client_secret=twitch["client_secret"]
+        client_id=settings.client_id, client_secret=settings.client_secret
     )
 
     # --- OpenAI Client ---
-    client_ai = OpenAI(api_key=api_key)
+    client_ai = OpenAI(api_key=settings.api_key, http_client=build_openai_http_client())
 
-    token_bucket = TokenBucket(tokens_per_minute)
+    token_bucket = TokenBucket(settings.tokens_per_minute)
+
+    configure_limits(
+        settings.max_openai_content_size,
+        settings.max_rate_limit_retries,
+        settings.max_concurrent_batches,
+    )
 
-    configure_limits(max_openai_content_size, max_rate_limit_retries)
+    for listener in log_listeners:
+        listener.start()
 
     # --- Moderation batch and run workers (threads) ---
     stop_event = threading.Event()
+    run_queue = new_run_queue()
     batch_thread = threading.Thread(
         target=batch_worker,
         args=(
             stop_event,
+            run_queue,
             client_ai,
-            assistant_id,
-            channel,
-            twitch["client_id"],
+            settings.assistant_id,
+            settings.channel,
+            settings.client_id,
             token_manager,  # pass manager so worker can refresh token
-            batch_interval,
+            settings.batch_interval,
         ),
+        daemon=True,
     )
     batch_thread.start()
 
@@ -107,14 +169,16 @@ def main():
         target=run_worker,
         args=(
             stop_event,
+            run_queue,
             client_ai,
-            assistant_id,
-            twitch["client_id"],
+            settings.assistant_id,
+            settings.client_id,
             token_manager,
             token_bucket,
-            moderation_timeout,
-            use_stream,
+            settings.moderation_timeout,
+            settings.use_stream,
         ),
+        daemon=True,
     )
     run_thread.start()
 
@@ -125,9 +189,20 @@ def main():
         print("\n[BOT] Exiting on user interrupt...")
     finally:
         stop_event.set()
-        batch_thread.join()
-        run_thread.join()
+        try:
+            batch_thread.join(timeout=SHUTDOWN_TIMEOUT)
+            run_thread.join(timeout=settings.moderation_timeout + SHUTDOWN_TIMEOUT)
+            if run_thread.is_alive():
+                print("[BOT] Moderation still busy; abandoning in-flight batches.")
+        except KeyboardInterrupt:
+            print("[BOT] Forced exit; abandoning in-flight batches.")
+        finally:
+            for listener in log_listeners:
+                listener.stop()
         loss_report()
+        client_ai.close()
+        chat_handler.close()
+        api_handler.close()
 
 
 if __name__ == "__main__":
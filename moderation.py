@@ -3,31 +3,157 @@ import json
 import logging
 import queue
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import math
+import random
+import functools
 import threading
-from utils import vprint, run_with_timeout
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from itertools import accumulate, islice
+from utils import (
+    vprint,
+    vprint_enabled,
+    run_with_timeout,
+    DaemonThreadPool,
+)
+
+from token_utils import count_tokens, count_tokens_fast, TokenBucket
+
+# Console output for the moderation pipeline; bot.py routes it through a
+# QueueListener so worker threads never block on stdout.
+log = logging.getLogger("moderation")
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional at runtime
+    orjson = None
+
+
+class BatchQueue(queue.Queue):
+    """``queue.Queue`` that can hand out many items per lock acquisition."""
+
+    def drain(self, max_items: int) -> list:
+        """Remove and return up to ``max_items`` queued items without blocking."""
+        with self.not_empty:
+            items = []
+            while self._qsize() and len(items) < max_items:
+                items.append(self._get())
+            if items:
+                self.not_full.notify(len(items))
+            return items
 
-from token_utils import count_tokens, TokenBucket
 
 # --- Message queue used for incoming messages from IRC ---
-message_queue = queue.Queue()
-run_queue = queue.Queue()
+message_queue = BatchQueue()
+
+
+class LossTracker:
+    """Thread-safe produced/consumed/not-moderated accounting.
+
+    Totals are plain integers; only IDs still awaiting moderation are kept,
+    in insertion order and capped at ``pending_limit`` so messages that never
+    come back cannot grow memory without bound (they still show up in the
+    missing total). Not-moderated IDs are kept as a bounded sample.
+    """
+
+    def __init__(self, pending_limit: int = 100_000, sample_size: int = 1000):
+        self.produced_total = 0
+        self.consumed_total = 0
+        self.not_moderated_total = 0
+        self.pending_limit = pending_limit
+        self._pending = {}
+        self.not_moderated_sample = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def produced(self, msg_ids) -> None:
+        msg_ids = list(msg_ids)
+        with self._lock:
+            self.produced_total += len(msg_ids)
+            self._pending.update(dict.fromkeys(msg_ids))
+            overflow = len(self._pending) - self.pending_limit
+            if overflow > 0:
+                oldest = list(islice(self._pending, overflow))
+                for msg_id in oldest:
+                    del self._pending[msg_id]
+
+    def consumed(self, msg_ids) -> None:
+        msg_ids = list(msg_ids)
+        with self._lock:
+            self.consumed_total += len(msg_ids)
+            for msg_id in msg_ids:
+                self._pending.pop(msg_id, None)
+
+    def not_moderated(self, msg_ids) -> None:
+        msg_ids = list(msg_ids)
+        with self._lock:
+            self.not_moderated_total += len(msg_ids)
+            self.not_moderated_sample.extend(msg_ids)
+            for msg_id in msg_ids:
+                self._pending.pop(msg_id, None)
+
+    def pending_sample(self, n: int = 10) -> list:
+        with self._lock:
+            return list(islice(self._pending, n))
+
+
+# --- Loss detection ---
+loss_tracker = LossTracker()
+_mark_produced = loss_tracker.produced
+_mark_consumed = loss_tracker.consumed
+_mark_not_moderated = loss_tracker.not_moderated
+
+
+# --- Shared HTTP session so Twitch Helix calls reuse keep-alive connections ---
+_twitch_session = requests.Session()
+_twitch_session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=50))
+# Last (ETag, parsed body) per Helix URL, used for conditional GETs.
+_etag_cache = {}
+# Worker pool for issuing flagged-message deletes concurrently.
+_twitch_pool = DaemonThreadPool(max_workers=8, thread_name_prefix="twitch")
+# Separate pool for the channel-info fan-out so a burst of flagged-message
+# deletes on _twitch_pool cannot delay it past its result timeout.
+_channel_info_pool = DaemonThreadPool(max_workers=4, thread_name_prefix="channel-info")
+
+
+@functools.lru_cache(maxsize=4)
+def _auth_headers(token, client_id) -> dict:
+    """Helix auth headers for ``token``, built once per token.
+
+    Sent per request rather than installed on the shared session, so each
+    caller always authenticates with the token it was given even while a
+    refresh is rotating it. Treat the returned dict as read-only.
+    """
+    return {"Client-ID": client_id, "Authorization": f"Bearer {token}"}
 
-produced_ids = set()
-consumed_ids = set()
-not_moderated = set()
 
 MAX_OPENAI_CONTENT_SIZE = 256000
 MAX_RATE_LIMIT_RETRIES = 3
+# How many batches may be in flight with OpenAI at once.
+MAX_CONCURRENT_BATCHES = 8
+# Longest a worker blocks on an empty queue before re-checking for shutdown.
+IDLE_WAIT = 1.0
+# On shutdown, how long batch_worker waits for room in run_queue for its
+# final flush, and how long run_worker waits for that flush to arrive.
+SHUTDOWN_FLUSH_WAIT = 10
+# Channel info refresh period, and a shorter retry while it is unavailable.
+CHANNEL_INFO_REFRESH = 60
+CHANNEL_INFO_RETRY = 5
+# Upper bound in seconds for the jittered part of rate-limit backoff.
+RATE_LIMIT_BACKOFF_CAP = 30
+
+_RETRY_AFTER_RE = re.compile(r"try again in ([0-9.]+)s", re.IGNORECASE)
 
 
 def configure_limits(
     max_openai_content_size: int | None = None,
     max_rate_limit_retries: int | None = None,
+    max_concurrent_batches: int | None = None,
 ) -> None:
     """Override module limits from configuration."""
-    global MAX_OPENAI_CONTENT_SIZE, MAX_RATE_LIMIT_RETRIES
+    global MAX_OPENAI_CONTENT_SIZE, MAX_RATE_LIMIT_RETRIES, MAX_CONCURRENT_BATCHES
     if max_openai_content_size is not None:
         try:
             MAX_OPENAI_CONTENT_SIZE = int(max_openai_content_size)
@@ -38,13 +164,48 @@ def configure_limits(
             MAX_RATE_LIMIT_RETRIES = int(max_rate_limit_retries)
         except Exception:
             pass
+    if max_concurrent_batches is not None:
+        try:
+            MAX_CONCURRENT_BATCHES = max(1, int(max_concurrent_batches))
+        except Exception:
+            pass
+
+
+def new_run_queue() -> queue.Queue:
+    """Create the batch_worker -> run_worker queue; call after configure_limits.
+
+    This bound is the only backpressure between the two: run_worker's
+    MAX_CONCURRENT_BATCHES threads take a batch only when idle, so once
+    twice that many are waiting, batch_worker blocks and waiting chat
+    coalesces into fewer, larger batches in message_queue.
+    """
+    return queue.Queue(maxsize=2 * MAX_CONCURRENT_BATCHES)
+
+
+# Stdlib fallback matching orjson's output: compact, with non-ASCII (emotes,
+# CJK chat) left as-is instead of expanded to \uXXXX escapes.
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _json_dumps(obj) -> str:
+    """Serialize ``obj`` to a JSON string, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return _json_encode(obj)
+
+
+def _json_loads(text):
+    """Parse a JSON string or bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
 
 
 def _parse_retry_after_seconds(message: str, default: int = 5) -> int:
     """Extract retry delay from a rate limit error message."""
     if not message:
         return default
-    match = re.search(r"try again in ([0-9.]+)s", message, re.IGNORECASE)
+    match = _RETRY_AFTER_RE.search(message)
     if match:
         try:
             return max(default, math.ceil(float(match.group(1))))
@@ -55,27 +216,26 @@ def _parse_retry_after_seconds(message: str, default: int = 5) -> int:
 
 def delete_chat_message(broadcaster_id, moderator_id, message_id, token, client_id):
     url = "https://api.twitch.tv/helix/moderation/chat"
-    headers = {
-        "Client-ID": client_id,
-        "Authorization": f"Bearer {token}",
-    }
+    headers = _auth_headers(token, client_id)
     params = {
         "broadcaster_id": broadcaster_id,
         "moderator_id": moderator_id,
         "message_id": message_id,
     }
     try:
-        response = requests.delete(url, headers=headers, params=params, timeout=10)
+        response = _twitch_session.delete(
+            url, headers=headers, params=params, timeout=10
+        )
         if response.status_code == 204:
-            print(f"[TWITCH] Deleted message {message_id}")
+            log.info(f"[TWITCH] Deleted message {message_id}")
             return True
         else:
-            print(
+            log.error(
                 f"[TWITCH][ERROR] Failed to delete message {message_id}: {response.status_code} - {response.text}"
             )
             return False
     except Exception as e:
-        print(f"[TWITCH][ERROR] Exception deleting message {message_id}: {e}")
+        log.error(f"[TWITCH][ERROR] Exception deleting message {message_id}: {e}")
         return False
 
 
@@ -109,7 +269,7 @@ def _extract_response_text(response, streamed_chunks=None):
                 if value:
                     texts.append(value)
     except Exception as e:
-        print(f"[ERROR][RESPONSE][PARSE] {e}")
+        log.error(f"[ERROR][RESPONSE][PARSE] {e}")
     if not texts:
         try:
             output_text = getattr(response, "output_text", None)
@@ -152,7 +312,7 @@ def _request_assistant_response(
                 final_response = stream.get_final_response()
             return _extract_response_text(final_response, streamed_chunks)
         except Exception as e:
-            print(f"[ERROR][MODERATION][STREAM] {e}")
+            log.error(f"[ERROR][MODERATION][STREAM] {e}")
             return None
     response = openai_client.responses.create(
         assistant_id=assistant_id,
@@ -161,182 +321,373 @@ def _request_assistant_response(
     return _extract_response_text(response)
 
 
+def _error_code(exc: BaseException):
+    """Return the OpenAI error ``code`` carried by ``exc``, if any."""
+    code = getattr(exc, "code", None)
+    body = getattr(exc, "body", None)
+    if code is None and isinstance(body, dict):
+        error = body.get("error")
+        code = body.get("code") or (
+            error.get("code") if isinstance(error, dict) else None
+        )
+    return code
+
+
+def _is_rate_limit_error(exc: BaseException) -> bool:
+    """Return True if ``exc`` looks like a retryable OpenAI rate-limit error.
+
+    Quota exhaustion is also a 429 but no retry can fix it, so it is excluded.
+    """
+    message = str(exc).lower()
+    if _error_code(exc) == "insufficient_quota" or "insufficient_quota" in message:
+        return False
+    return getattr(exc, "status_code", None) == 429 or "rate limit" in message
+
+
+def _retry_on_rate_limit(func):
+    """Retry ``func`` on rate-limit errors with exponential backoff.
+
+    Retries at most ``MAX_RATE_LIMIT_RETRIES`` times. With a ``token_bucket``
+    keyword argument the bucket's rate is cut and it is held empty for the
+    server's retry-after hint, which the retry waits out when it reserves
+    tokens again. Without one, each retry sleeps the hint plus a full-jitter
+    exponential delay.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token_bucket = kwargs.get("token_bucket")
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not _is_rate_limit_error(e):
+                    raise
+                if attempt >= MAX_RATE_LIMIT_RETRIES:
+                    log.error(
+                        "[ERROR][MODERATION] Exceeded maximum retries due to rate limit"
+                    )
+                    raise
+                retry_after = _parse_retry_after_seconds(str(e))
+                log.warning(
+                    f"[RATE LIMIT] Response request hit rate limit, retrying in {retry_after}s..."
+                )
+                if token_bucket is not None:
+                    # The retry's consume() waits out the hold; no sleep here.
+                    token_bucket.decrease_rate(retry_after)
+                else:
+                    time.sleep(
+                        retry_after
+                        + random.uniform(0, min(RATE_LIMIT_BACKOFF_CAP, 2**attempt))
+                    )
+                attempt += 1
+
+    return wrapper
+
+
+@_retry_on_rate_limit
+def _send_moderation_request(
+    openai_client,
+    assistant_id,
+    batch_json: str,
+    use_stream: bool,
+    tokens_needed: int = 0,
+    token_bucket=None,
+):
+    """Reserve ``tokens_needed`` and fetch the assistant's verdict."""
+    if token_bucket is not None:
+        token_bucket.consume(tokens_needed)
+    latest = _request_assistant_response(
+        openai_client, assistant_id, batch_json, use_stream
+    )
+    if latest is None:
+        raise RuntimeError("Assistant response was empty.")
+    if token_bucket is not None:
+        token_bucket.increase_rate()
+    return latest
+
+
+def _split_batch_by_size(batch, overhead: int, limit: int):
+    """Split ``batch`` into consecutive chunks whose JSON fits in ``limit``.
+
+    Each message is serialized once to learn its size; chunk boundaries are
+    then found with a binary search over the running total. A message that
+    is too large on its own ends up alone in its chunk.
+    """
+    # +1 per message accounts for the separating comma in the JSON array.
+    prefix = list(accumulate(len(_json_dumps(msg)) + 1 for msg in batch))
+    budget = limit - overhead
+    chunks = []
+    start = 0
+    while start < len(batch):
+        used = prefix[start - 1] if start else 0
+        end = max(bisect_right(prefix, used + budget, lo=start), start + 1)
+        chunks.append(batch[start:end])
+        start = end
+    return chunks
+
+
+@dataclass(frozen=True)
+class BatchContext:
+    """Channel context shared by every batch until the next refresh.
+
+    ``json`` is the serialized context block and ``tokens`` its token count
+    (excluding the base prompt), both computed once per channel-info
+    refresh instead of once per batch.
+    """
+
+    channel_info: dict | None
+    json: str
+    tokens: int
+
+
+def build_batch_context(channel_info=None) -> BatchContext:
+    """Serialize ``channel_info`` into a reusable :class:`BatchContext`."""
+    context = (
+        {
+            "game": channel_info.get("stream", {}).get("game_name"),
+            "channel_info": channel_info,
+        }
+        if channel_info
+        else {}
+    )
+    context_json = _json_dumps(context)
+    return BatchContext(
+        channel_info, context_json, count_tokens(context_json, include_base=False)
+    )
+
+
 def moderate_batch(
     openai_client,
     assistant_id,
     batch,
-    channel_info=None,
+    context: BatchContext | None = None,
     token=None,
     client_id=None,
     token_bucket: TokenBucket = None,
     use_stream: bool = False,
+    cancelled: threading.Event | None = None,
 ):
-    try:
-        context = (
-            {
-                "game": (
-                    channel_info.get("stream", {}).get("game_name")
-                    if channel_info
-                    else None
-                ),
-                "channel_info": channel_info,
-            }
-            if channel_info
-            else {}
-        )
+    """Send ``batch`` for moderation and delete the flagged messages.
 
-        payload = {
-            "context": context,
-            "messages": batch,
-        }
-        batch_json = json.dumps(payload)
-        if len(batch_json) > MAX_OPENAI_CONTENT_SIZE:
-            print(
-                f"[ERROR][MODERATION] Batch too large ({len(batch_json)} chars), splitting and retrying."
+    ``cancelled`` is run_with_timeout's ``cancel_event``: once set, the batch
+    has already been reported as not moderated and must not touch chat.
+    """
+    try:
+        if cancelled is not None and cancelled.is_set():
+            return False
+        if context is None:
+            context = build_batch_context()
+        channel_info = context.channel_info
+
+        # The context block is pre-serialized; only the messages are new.
+        overhead = len(context.json) + len('{"context":,"messages":[]}')
+        # Message text alone is a lower bound on the encoded size, so a batch
+        # that is over the limit on text alone can skip the full dump.
+        text_size = sum(len(msg.get("message") or "") for msg in batch)
+        if overhead + text_size > MAX_OPENAI_CONTENT_SIZE:
+            batch_json = None
+        else:
+            messages_json = _json_dumps(batch)
+            batch_json = (
+                '{"context":' + context.json + ',"messages":' + messages_json + "}"
+            )
+        if batch_json is None or len(batch_json) > MAX_OPENAI_CONTENT_SIZE:
+            size = len(batch_json) if batch_json is not None else f">{text_size}"
+            log.error(
+                f"[ERROR][MODERATION] Batch too large ({size} chars), splitting and retrying."
             )
             if len(batch) == 1:
-                print(
+                log.error(
                     f"[FATAL][MODERATION] Single message too large to send, skipping: {batch[0]['id']}"
                 )
                 return False
-            mid = len(batch) // 2
-            left = moderate_batch(
-                openai_client,
-                assistant_id,
-                batch[:mid],
-                channel_info,
-                token,
-                client_id,
-                token_bucket,
-                use_stream,
-            )
-            right = moderate_batch(
+            results = [
+                moderate_batch(
+                    openai_client,
+                    assistant_id,
+                    chunk,
+                    context,
+                    token,
+                    client_id,
+                    token_bucket,
+                    use_stream,
+                    cancelled,
+                )
+                for chunk in _split_batch_by_size(
+                    batch, overhead, MAX_OPENAI_CONTENT_SIZE
+                )
+            ]
+            return all(results)
+
+        # Estimate once up front (bytes / 4, no BPE pass); retries reserve the
+        # same amount again.
+        tokens_needed = (
+            context.tokens + count_tokens_fast(messages_json)
+            if token_bucket is not None
+            else 0
+        )
+        try:
+            latest = _send_moderation_request(
                 openai_client,
                 assistant_id,
-                batch[mid:],
-                channel_info,
-                token,
-                client_id,
-                token_bucket,
+                batch_json,
                 use_stream,
+                tokens_needed,
+                token_bucket=token_bucket,
             )
-            return left and right
-
-        latest = None
-        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
-            if token_bucket is not None:
-                tokens_needed = count_tokens(batch_json)
-                token_bucket.consume(tokens_needed)
-            try:
-                latest = _request_assistant_response(
-                    openai_client, assistant_id, batch_json, use_stream
-                )
-                if latest is None:
-                    raise RuntimeError("Assistant response was empty.")
-                break
-            except Exception as e:
-                msg = str(e)
-                if "rate limit" in msg.lower():
-                    wait = _parse_retry_after_seconds(msg)
-                    print(
-                        f"[RATE LIMIT] Response request hit rate limit, retrying in {wait}s..."
-                    )
-                    time.sleep(wait)
-                    continue
-                print(f"[ERROR][MODERATION] Exception fetching response: {e}")
-                return False
-        else:
-            print("[ERROR][MODERATION] Exceeded maximum retries due to rate limit")
+        except Exception as e:
+            log.error(f"[ERROR][MODERATION] Exception fetching response: {e}")
             return False
 
-        print(f"[MODERATION]\n{latest}\n{'='*40}")
+        if cancelled is not None and cancelled.is_set():
+            return False
+        log.info(f"[MODERATION]\n{latest}\n{'='*40}")
         if latest:
             logging.info(f"[MODERATION RESULT] {latest}")
+            # Only a JSON array can carry flags; skip parsing free-form replies.
+            stripped = latest.lstrip()
             try:
-                flagged = json.loads(latest)
+                flagged = _json_loads(stripped) if stripped.startswith("[") else None
                 if isinstance(flagged, list) and flagged:
                     broadcaster_id = channel_info["user"]["id"]
                     moderator_id = channel_info["user"]["id"]
-                    for msg in flagged:
-                        msg_id = msg.get("id")
-                        if msg_id:
-                            delete_chat_message(
+                    msg_ids = []
+                    dropped = []
+                    for item in flagged:
+                        # The reply is model output: skip entries without an id.
+                        if isinstance(item, dict) and item.get("id"):
+                            msg_ids.append(item["id"])
+                        else:
+                            dropped.append(item)
+                    if dropped:
+                        log.warning(
+                            f"[WARN][MODERATION] Ignoring {len(dropped)} flagged entries without a message id: {dropped[:5]}"
+                        )
+                    # Issue the deletes concurrently over the pooled session.
+                    list(
+                        _twitch_pool.map(
+                            lambda msg_id: delete_chat_message(
                                 broadcaster_id, moderator_id, msg_id, token, client_id
-                            )
+                            ),
+                            msg_ids,
+                        )
+                    )
             except Exception as e:
-                print(f"[ERROR][MODERATION][DELETE] Failed to parse/delete: {e}")
+                log.error(f"[ERROR][MODERATION][DELETE] Failed to parse/delete: {e}")
 
-        for msg in batch:
-            consumed_ids.add(msg["id"])
+        if cancelled is not None and cancelled.is_set():
+            return False
+        _mark_consumed(msg["id"] for msg in batch)
         return True
 
     except Exception as e:
-        print(f"[ERROR][MODERATION][UNHANDLED] {e}")
+        log.error(f"[ERROR][MODERATION][UNHANDLED] {e}")
         return False
 
 
+def _helix_json(resp):
+    """Parse a Helix response body once, or return {} for a non-200 status."""
+    if resp.status_code != 200:
+        return {}
+    return _json_loads(resp.content)
+
+
+def _helix_get(url, headers):
+    """GET a Helix URL and return its parsed body, revalidating via ETag.
+
+    When a previous response carried an ETag it is sent back as
+    ``If-None-Match``; a ``304 Not Modified`` reply reuses the cached body.
+    """
+    cached = _etag_cache.get(url)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+    resp = _twitch_session.get(url, headers=headers, timeout=10)
+    if resp.status_code == 304 and cached:
+        return cached[1]
+    body = _helix_json(resp)
+    etag = resp.headers.get("ETag")
+    if etag and resp.status_code == 200:
+        _etag_cache[url] = (etag, body)
+    return body
+
+
 def get_channel_info(channel, client_id, token):
     user_login = channel.lstrip("#")
-    headers = {
-        "Client-ID": client_id,
-        "Authorization": f"Bearer {token}",
-    }
+    headers = _auth_headers(token, client_id)
     info = {}
     try:
         user_url = f"https://api.twitch.tv/helix/users?login={user_login}"
-        user_resp = requests.get(user_url, headers=headers, timeout=10)
-        if user_resp.status_code != 200 or not user_resp.json().get("data"):
+        users = _helix_get(user_url, headers).get("data")
+        if not users:
             return None
-        user_data = user_resp.json()["data"][0]
+        user_data = users[0]
         info["user"] = user_data
         user_id = user_data["id"]
 
-        stream_url = f"https://api.twitch.tv/helix/streams?user_id={user_id}"
-        stream_resp = requests.get(stream_url, headers=headers, timeout=10)
-        stream_data = (
-            stream_resp.json()["data"][0]
-            if stream_resp.status_code == 200 and stream_resp.json().get("data")
-            else {}
-        )
-        info["stream"] = stream_data
-
-        chan_url = f"https://api.twitch.tv/helix/channels?broadcaster_id={user_id}"
-        chan_resp = requests.get(chan_url, headers=headers, timeout=10)
-        chan_data = (
-            chan_resp.json()["data"][0]
-            if chan_resp.status_code == 200 and chan_resp.json().get("data")
-            else {}
-        )
-        info["channel"] = chan_data
-
-        tags_url = f"https://api.twitch.tv/helix/tags/streams?broadcaster_id={user_id}"
-        tags_resp = requests.get(tags_url, headers=headers, timeout=10)
-        tags = (
-            tags_resp.json().get("data")
-            if tags_resp.status_code == 200 and tags_resp.json().get("data")
-            else []
-        )
-        info["tags"] = tags
+        # The remaining lookups only depend on user_id, so issue them together.
+        urls = {
+            "stream": f"https://api.twitch.tv/helix/streams?user_id={user_id}",
+            "channel": f"https://api.twitch.tv/helix/channels?broadcaster_id={user_id}",
+            "tags": f"https://api.twitch.tv/helix/tags/streams?broadcaster_id={user_id}",
+            "follows": f"https://api.twitch.tv/helix/users/follows?to_id={user_id}&first=1",
+        }
+        futures = {
+            key: _channel_info_pool.submit(_helix_get, url, headers)
+            for key, url in urls.items()
+        }
+        results = {}
+        for key, future in futures.items():
+            # A failing endpoint only leaves its own section empty.
+            try:
+                results[key] = future.result(timeout=10)
+            except Exception as e:
+                log.warning(f"[WARN] Channel info lookup '{key}' failed: {e}")
+                results[key] = {}
 
-        follows_url = (
-            f"https://api.twitch.tv/helix/users/follows?to_id={user_id}&first=1"
-        )
-        follows_resp = requests.get(follows_url, headers=headers, timeout=10)
-        follows_count = (
-            follows_resp.json().get("total", 0)
-            if follows_resp.status_code == 200
-            else 0
-        )
-        info["followers"] = follows_count
+        streams = results["stream"].get("data")
+        info["stream"] = streams[0] if streams else {}
+
+        channels = results["channel"].get("data")
+        info["channel"] = channels[0] if channels else {}
+
+        info["tags"] = results["tags"].get("data") or []
+
+        info["followers"] = results["follows"].get("total", 0)
     except Exception as e:
-        print(f"[ERROR][CHANNEL_INFO] Exception: {e}")
+        log.error(f"[ERROR][CHANNEL_INFO] Exception: {e}")
         return None
 
     return info
 
 
+def _fetch_batch_context(channel, client_id, token_manager):
+    try:
+        channel_info = get_channel_info(channel, client_id, token_manager.get_token())
+    except Exception as e:
+        log.warning(f"[WARN] Could not fetch channel info: {e}")
+        channel_info = None
+    return build_batch_context(channel_info)
+
+
+def _channel_info_refresher(stop_event, channel, client_id, token_manager, context_ref):
+    """Refresh ``context_ref[0]`` in the background until ``stop_event`` is set."""
+    while True:
+        interval = (
+            CHANNEL_INFO_REFRESH
+            if context_ref[0].channel_info is not None
+            else CHANNEL_INFO_RETRY
+        )
+        if stop_event.wait(interval):
+            return
+        # Swapping the single list element is atomic; readers never block.
+        context_ref[0] = _fetch_batch_context(channel, client_id, token_manager)
+
+
 def batch_worker(
     stop_event,
+    run_queue,
     openai_client,
     assistant_id,
     channel,
@@ -346,52 +697,98 @@ def batch_worker(
 ):
     """Process queued messages in batches and moderate them."""
     batch = []
-    last_send = time.time()
-    channel_info = None
-    last_channel_info_time = 0
-    CHANNEL_INFO_REFRESH = 60
-
-    while not stop_event.is_set() or not message_queue.empty():
-        try:
-            while not message_queue.empty() and len(batch) < 500:
-                msg = message_queue.get()
-                produced_ids.add(msg["id"])
-                batch.append(msg)
-
-            now = time.time()
-            if (
-                now - last_channel_info_time > CHANNEL_INFO_REFRESH
-                or channel_info is None
-            ):
-                try:
-                    channel_info = get_channel_info(
-                        channel, client_id, token_manager.get_token()
-                    )
-                    last_channel_info_time = now
-                except Exception as e:
-                    print(f"[WARN] Could not fetch channel info: {e}")
-                    channel_info = None
-
-            if batch and (now - last_send >= batch_interval):
-                vprint(
-                    1,
-                    f"[INFO] Queuing batch of {len(batch)} messages for moderation...",
+    last_send = time.monotonic()
+    try:
+        # Fetch once up front so the first batch has channel context, then
+        # keep it fresh on a separate thread so this loop never blocks on Helix.
+        context_ref = [_fetch_batch_context(channel, client_id, token_manager)]
+        threading.Thread(
+            target=_channel_info_refresher,
+            args=(stop_event, channel, client_id, token_manager, context_ref),
+            name="channel-info",
+            daemon=True,
+        ).start()
+
+        while not stop_event.is_set() or not message_queue.empty():
+            try:
+                # Block until a message arrives or the current batch is due,
+                # waking at least every IDLE_WAIT seconds to notice shutdown.
+                wait = (
+                    batch_interval - (time.monotonic() - last_send)
+                    if batch
+                    else IDLE_WAIT
                 )
-                run_queue.put((batch.copy(), channel_info))
-                batch.clear()
-                last_send = now
-            time.sleep(0.05)
-        except Exception as e:
-            print(f"[ERROR][BATCH] {e}")
+                wait = min(max(wait, 0), IDLE_WAIT)
+                if len(batch) >= 500:
+                    time.sleep(wait)
+                    msg = None
+                else:
+                    try:
+                        msg = message_queue.get(timeout=wait)
+                    except queue.Empty:
+                        msg = None
+                if msg is not None:
+                    new_msgs = [msg] + message_queue.drain(499 - len(batch))
+                    _mark_produced(m["id"] for m in new_msgs)
+                    batch.extend(new_msgs)
+
+                now = time.monotonic()
+                if batch and (now - last_send >= batch_interval):
+                    if vprint_enabled(1):
+                        vprint(
+                            1,
+                            f"[INFO] Queuing batch of {len(batch)} messages for moderation...",
+                        )
+                    if not _put_batch(
+                        run_queue, (batch.copy(), context_ref[0]), stop_event
+                    ):
+                        # Shutting down with run_worker saturated: leave the
+                        # rest to the bounded final flush below.
+                        break
+                    batch.clear()
+                    last_send = now
+            except Exception as e:
+                log.error(f"[ERROR][BATCH] {e}")
+
+        leftover = message_queue.drain(message_queue.qsize())
+        if leftover:
+            _mark_produced(m["id"] for m in leftover)
+            batch.extend(leftover)
+        if batch:
+            vprint(1, f"[INFO] Final flush of {len(batch)} messages...")
+            try:
+                run_queue.put(
+                    (batch.copy(), context_ref[0]), timeout=SHUTDOWN_FLUSH_WAIT
+                )
+            except queue.Full:
+                log.error(
+                    f"[ERROR][BATCH] No room for the final flush within {SHUTDOWN_FLUSH_WAIT}s. Marking {len(batch)} messages as NOT MODERATED."
+                )
+                _mark_not_moderated(m["id"] for m in batch)
+            batch.clear()
+    finally:
+        # Tell run_worker that no more batches are coming. If it is still
+        # saturated it stops on its own once stop_event is set and it idles.
+        try:
+            run_queue.put(None, timeout=SHUTDOWN_FLUSH_WAIT)
+        except queue.Full:
+            pass
 
-    if batch:
-        vprint(1, f"[INFO] Final flush of {len(batch)} messages...")
-        run_queue.put((batch.copy(), channel_info))
-        batch.clear()
+
+def _put_batch(run_queue, item, stop_event) -> bool:
+    """Put ``item`` on ``run_queue``; give up if it is full once shutdown starts."""
+    while True:
+        try:
+            run_queue.put(item, timeout=IDLE_WAIT)
+            return True
+        except queue.Full:
+            if stop_event.is_set():
+                return False
 
 
 def run_worker(
     stop_event,
+    run_queue,
     openai_client,
     assistant_id,
     client_id,
@@ -400,9 +797,15 @@ def run_worker(
     moderation_timeout=60,
     use_stream: bool = False,
 ):
-    """Process batches from run_queue in parallel worker threads."""
+    """Moderate batches from ``run_queue`` on MAX_CONCURRENT_BATCHES threads."""
+    # Timed moderation calls get their own pool, one helper per batch worker,
+    # so abandoned calls count against MAX_CONCURRENT_BATCHES until they end.
+    call_pool = DaemonThreadPool(
+        max_workers=MAX_CONCURRENT_BATCHES, thread_name_prefix="moderation-call"
+    )
 
-    def _run_single_batch(batch, channel_info):
+    def _run_single_batch(batch, context):
+        cancelled = threading.Event()
         try:
             ok = run_with_timeout(
                 moderate_batch,
@@ -410,65 +813,90 @@ def run_worker(
                     openai_client,
                     assistant_id,
                     batch,
-                    channel_info,
+                    context,
                     token_manager.get_token(),
                     client_id,
                     token_bucket,
                     use_stream,
                 ),
+                kwargs={"cancelled": cancelled},
                 timeout=moderation_timeout,
+                cancel_event=cancelled,
+                pool=call_pool,
             )
         except KeyboardInterrupt:
             stop_event.set()
             return
         except RuntimeError as e:
-            print(f"[ERROR][MODERATION][WORKER] {e}")
+            log.error(f"[ERROR][MODERATION][WORKER] {e}")
             stop_event.set()
             return
 
         if not ok:
-            print(
+            log.error(
                 f"[ERROR][BATCH] Moderation failed or timed out or API did not respond. Marking {len(batch)} messages as NOT MODERATED and moving on."
             )
             debug_ids = [msg["id"] for msg in batch]
-            not_moderated.update(debug_ids)
-            print(
+            _mark_not_moderated(debug_ids)
+            log.info(
                 f"[DEBUG][NOT-MODERATED] Message IDs not moderated (sample): {debug_ids[:10]}{' ...' if len(debug_ids) > 10 else ''}"
             )
 
-    worker_threads: list[threading.Thread] = []
-    try:
-        while not stop_event.is_set() or not run_queue.empty():
+    def _consume():
+        idle_since = None
+        while True:
+            # batch_worker's None ends the loop. Should it never come, stop
+            # once shutdown has left the queue empty for SHUTDOWN_FLUSH_WAIT.
             try:
-                batch, channel_info = run_queue.get(timeout=1)
+                item = run_queue.get(timeout=IDLE_WAIT)
             except queue.Empty:
+                if not stop_event.is_set():
+                    continue
+                if idle_since is None:
+                    idle_since = time.monotonic()
+                if time.monotonic() - idle_since >= SHUTDOWN_FLUSH_WAIT:
+                    return
                 continue
-
-            batch_thread = threading.Thread(
-                target=_run_single_batch, args=(batch, channel_info), daemon=True
-            )
-            batch_thread.start()
-            worker_threads.append(batch_thread)
-    except KeyboardInterrupt:
-        stop_event.set()
-    finally:
-        for t in worker_threads:
+            idle_since = None
+            if item is None:
+                # Pass the sentinel on so every sibling thread sees it too.
+                run_queue.put(None)
+                return
+            _run_single_batch(*item)
+
+    workers = [
+        threading.Thread(target=_consume, name=f"moderation_{i}", daemon=True)
+        for i in range(MAX_CONCURRENT_BATCHES)
+    ]
+    for t in workers:
+        t.start()
+    try:
+        for t in workers:
             t.join()
+    finally:
+        call_pool.shutdown(wait=False)
 
 
 def loss_report():
-    missing = produced_ids - consumed_ids
+    produced = loss_tracker.produced_total
+    consumed = loss_tracker.consumed_total
+    missing = produced - consumed
+    missing_sample = loss_tracker.pending_sample(10)
+    missing_sample += list(loss_tracker.not_moderated_sample)[
+        : 10 - len(missing_sample)
+    ]
     print(f"\n[LOSS DETECTION]")
-    print(f"  Total messages produced: {len(produced_ids)}")
-    print(f"  Total messages consumed: {len(consumed_ids)}")
-    print(f"  Total missing: {len(missing)}")
-    if missing:
+    print(f"  Total messages produced: {produced}")
+    print(f"  Total messages consumed: {consumed}")
+    print(f"  Total missing: {missing}")
+    if missing > 0:
         print(
-            f"  Missing message IDs: {list(missing)[:10]}{' ...' if len(missing) > 10 else ''}"
+            f"  Missing message IDs: {missing_sample}{' ...' if missing > 10 else ''}"
         )
-    if not_moderated:
+    if loss_tracker.not_moderated_total:
+        not_moderated = loss_tracker.not_moderated_total
         print(f"\n[NOT MODERATED]")
-        print(f"  Total messages not moderated: {len(not_moderated)}")
+        print(f"  Total messages not moderated: {not_moderated}")
         print(
-            f"  Example IDs: {list(not_moderated)[:10]}{' ...' if len(not_moderated) > 10 else ''}"
+            f"  Example IDs: {list(loss_tracker.not_moderated_sample)[:10]}{' ...' if not_moderated > 10 else ''}"
         )
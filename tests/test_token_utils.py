@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from token_utils import TokenBucket
+
+
+class TokenBucketRateTest(unittest.TestCase):
+    def setUp(self):
+        # 600 tokens/minute -> 10 tokens/second at full rate.
+        self.bucket = TokenBucket(600, increase_step=0.1, decrease_factor=0.5)
+
+    def test_decrease_is_multiplicative_and_floored(self):
+        self.bucket.decrease_rate()
+        self.assertAlmostEqual(self.bucket.rate, 5.0)
+        for _ in range(20):
+            self.bucket.decrease_rate()
+        self.assertAlmostEqual(self.bucket.rate, self.bucket.min_rate)
+        self.assertAlmostEqual(self.bucket.min_rate, 1.0)
+
+    def test_increase_is_additive_and_capped(self):
+        for _ in range(20):
+            self.bucket.decrease_rate()
+        self.bucket.increase_rate()
+        self.assertAlmostEqual(self.bucket.rate, 2.0)
+        for _ in range(50):
+            self.bucket.increase_rate()
+        self.assertAlmostEqual(self.bucket.rate, self.bucket.max_rate)
+        self.assertAlmostEqual(self.bucket.max_rate, 10.0)
+
+    def test_refill_never_exceeds_capacity(self):
+        self.bucket.timestamp -= 3600
+        self.bucket.consume(0)
+        self.assertEqual(self.bucket.tokens, self.bucket.capacity)
+
+    def test_retry_after_holds_the_bucket_once(self):
+        self.bucket.decrease_rate(retry_after=0.2)
+        self.assertEqual(self.bucket.tokens, 0.0)
+        start = time.monotonic()
+        self.bucket.consume(0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        # The hold is spent; the next caller is not delayed again.
+        start = time.monotonic()
+        self.bucket.consume(0)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from utils import DaemonThreadPool
+
+
+class DaemonThreadPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = DaemonThreadPool(max_workers=1, thread_name_prefix="test")
+
+    def tearDown(self):
+        self.pool.shutdown(wait=True)
+
+    def test_submit_returns_result(self):
+        future = self.pool.submit(lambda a, b=0: a + b, 2, b=3)
+        self.assertEqual(future.result(timeout=5), 5)
+
+    def test_map_preserves_order(self):
+        self.assertEqual(list(self.pool.map(lambda x: x * x, [1, 2, 3])), [1, 4, 9])
+
+    def test_exception_propagates(self):
+        def boom():
+            raise ValueError("boom")
+
+        future = self.pool.submit(boom)
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        # The worker survives the exception and keeps serving.
+        self.assertEqual(self.pool.submit(lambda: 1).result(timeout=5), 1)
+
+    def test_cancel_before_start(self):
+        release = threading.Event()
+        blocker = self.pool.submit(release.wait, 5)
+        queued = self.pool.submit(lambda: "ran")
+        self.assertTrue(queued.cancel())
+        release.set()
+        self.assertTrue(blocker.result(timeout=5))
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(self.pool.submit(lambda: "next").result(timeout=5), "next")
+
+    def test_idle_thread_is_reused(self):
+        pool = DaemonThreadPool(max_workers=4, thread_name_prefix="reuse")
+        try:
+            names = set()
+            for _ in range(5):
+                names.add(
+                    pool.submit(lambda: threading.current_thread().name).result(
+                        timeout=5
+                    )
+                )
+                # Give the worker a moment to report itself idle.
+                time.sleep(0.05)
+            self.assertEqual(names, {"reuse_0"})
+        finally:
+            pool.shutdown(wait=True)
+
+    def test_threads_capped_at_max_workers(self):
+        pool = DaemonThreadPool(max_workers=2, thread_name_prefix="cap")
+        try:
+            release = threading.Event()
+            futures = [pool.submit(release.wait, 5) for _ in range(5)]
+            release.set()
+            for future in futures:
+                future.result(timeout=5)
+            self.assertEqual(len(pool._threads), 2)
+        finally:
+            pool.shutdown(wait=True)
+
+    def test_workers_are_daemon_threads(self):
+        self.pool.submit(lambda: None).result(timeout=5)
+        self.assertTrue(all(t.daemon for t in self.pool._threads))
+
+    def test_shutdown_waits_for_queued_work(self):
+        done = []
+        for i in range(3):
+            self.pool.submit(lambda i=i: (time.sleep(0.05), done.append(i)))
+        self.pool.shutdown(wait=True)
+        self.assertEqual(done, [0, 1, 2])
+        self.assertFalse(any(t.is_alive() for t in self.pool._threads))
+        with self.assertRaises(RuntimeError):
+            self.pool.submit(lambda: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
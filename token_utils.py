@@ -1,6 +1,7 @@
 import os
 import threading
 import time
+from functools import lru_cache
 from typing import Optional
 
 try:
@@ -36,41 +37,102 @@ else:
         PROMPT_TOKENS = 0
 
 
-def count_tokens(text: str, model: Optional[str] = None) -> int:
-    """Return the number of tokens for ``text`` plus the base prompt."""
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str] = None):
+    """Return the tiktoken encoding for ``model``, cached per model."""
+    enc = tiktoken.encoding_for_model(model) if model else _DEFAULT_ENCODING
+    if enc is None:
+        enc = tiktoken.get_encoding("cl100k_base")
+    return enc
+
+
+def count_tokens(
+    text: str, model: Optional[str] = None, include_base: bool = True
+) -> int:
+    """Return the number of tokens for ``text``.
+
+    The base prompt's tokens are added unless ``include_base`` is False.
+    """
+    base = PROMPT_TOKENS if include_base else 0
     if tiktoken is None:
-        return len(text.split()) + PROMPT_TOKENS
+        return len(text.split()) + base
     try:
-        enc = tiktoken.encoding_for_model(model) if model else _DEFAULT_ENCODING
-        if enc is None:
-            enc = tiktoken.get_encoding("cl100k_base")
-        return len(enc.encode(text)) + PROMPT_TOKENS
+        return len(_get_encoding(model).encode_ordinary(text)) + base
     except Exception:
-        return len(text.split()) + PROMPT_TOKENS
+        return len(text.split()) + base
+
+
+def count_tokens_fast(text: str, include_base: bool = True) -> int:
+    """Estimate tokens for ``text`` as UTF-8 bytes / 4, without running BPE.
+
+    Close to cl100k counts for chat text; use it for rate-limit budgeting and
+    :func:`count_tokens` where an exact figure matters.
+    """
+    base = PROMPT_TOKENS if include_base else 0
+    return len(text.encode("utf-8")) // 4 + base
 
 
 class TokenBucket:
-    """Simple token bucket rate limiter."""
+    """Token bucket rate limiter with adaptive refill.
 
-    def __init__(self, tokens_per_minute: int):
+    The refill rate starts at ``tokens_per_minute`` and adapts to what the
+    API actually accepts: it is cut multiplicatively on rate-limit errors
+    and grown additively on success, never exceeding the configured rate.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        min_rate_fraction: float = 0.1,
+    ):
         self.capacity = max(1, tokens_per_minute)
         self.tokens = float(self.capacity)
         self.rate = float(tokens_per_minute) / 60.0
-        self.timestamp = time.time()
+        self.max_rate = self.rate
+        self.min_rate = self.rate * min_rate_fraction
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.timestamp = time.monotonic()
         self.lock = threading.Lock()
 
+    def increase_rate(self):
+        """Additively raise the refill rate after a successful request."""
+        with self.lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * self.increase_step
+            )
+
+    def decrease_rate(self, retry_after: Optional[float] = None):
+        """Cut the refill rate after a rate-limit error.
+
+        When the server supplied a ``retry_after`` hint the bucket is also
+        drained and held empty for that long, so every caller, including the
+        one retrying, waits it out once in ``consume``.
+        """
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            if retry_after:
+                self.tokens = 0.0
+                self.timestamp = max(
+                    self.timestamp, time.monotonic() + float(retry_after)
+                )
+
     def consume(self, amount: int):
         """Consume ``amount`` tokens, sleeping if necessary."""
         with self.lock:
-            now = time.time()
-            elapsed = now - self.timestamp
-            self.timestamp = now
+            now = time.monotonic()
+            # A retry-after hold from decrease_rate leaves timestamp ahead.
+            hold = max(0.0, self.timestamp - now)
+            elapsed = max(0.0, now - self.timestamp)
+            self.timestamp = max(now, self.timestamp)
             self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
             if amount > self.tokens:
-                wait_time = (amount - self.tokens) / self.rate
+                wait_time = hold + (amount - self.tokens) / self.rate
                 self.tokens = 0
             else:
-                wait_time = 0
+                wait_time = hold
                 self.tokens -= amount
         if wait_time > 0:
             time.sleep(wait_time)
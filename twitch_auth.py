@@ -1,27 +1,35 @@
 import os
 import time
-import json
 import webbrowser
 import ssl
 import threading
 import http.server
 import socketserver
 import urllib.parse
+from urllib.parse import urlparse, parse_qs
 from typing import Optional
 import re
-from utils import vprint
+import requests
+from utils import vprint, vprint_enabled, load_json, save_json
 
 # You need to install: cryptography
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
-from datetime import datetime, timedelta
+from cryptography.hazmat.primitives.asymmetric import ec
+from datetime import datetime, timedelta, timezone
 
 TOKEN_FILE = "twitch_token.json"
 CERT_FILE = "localhost.pem"
 KEY_FILE = "localhost-key.pem"
 
+# Keep-alive session for the OAuth token endpoint, reused across refreshes.
+_token_session = requests.Session()
+
+# Server SSLContext for the OAuth callback, with the cert files it was built from.
+_SSL_CTX: Optional[ssl.SSLContext] = None
+_SSL_CTX_KEY = None
+
 
 def get_selfsigned_cert(certfile: str = CERT_FILE, keyfile: str = KEY_FILE):
     """
@@ -29,7 +37,8 @@ def get_selfsigned_cert(certfile: str = CERT_FILE, keyfile: str = KEY_FILE):
     """
     if not (os.path.exists(certfile) and os.path.exists(keyfile)):
         print("[CERT] Generating new self-signed cert for localhost...")
-        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        # P-256 keygen is near-instant, unlike RSA's prime search.
+        key = ec.generate_private_key(ec.SECP256R1())
         subject = issuer = x509.Name(
             [
                 x509.NameAttribute(NameOID.COUNTRY_NAME, "US"),
@@ -39,14 +48,17 @@ def get_selfsigned_cert(certfile: str = CERT_FILE, keyfile: str = KEY_FILE):
                 x509.NameAttribute(NameOID.COMMON_NAME, "localhost"),
             ]
         )
+        now = datetime.now(timezone.utc)
         cert = (
             x509.CertificateBuilder()
             .subject_name(subject)
             .issuer_name(issuer)
             .public_key(key.public_key())
             .serial_number(x509.random_serial_number())
-            .not_valid_before(datetime.utcnow())
-            .not_valid_after(datetime.utcnow() + timedelta(days=3650))
+            # Backdated so a client clock running slightly behind still
+            # accepts the certificate.
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=3650))
             .add_extension(
                 x509.SubjectAlternativeName([x509.DNSName("localhost")]),
                 critical=False,
@@ -69,16 +81,56 @@ def get_selfsigned_cert(certfile: str = CERT_FILE, keyfile: str = KEY_FILE):
     return certfile, keyfile
 
 
+def _get_ssl_context(certfile: str, keyfile: str) -> ssl.SSLContext:
+    """Return a cached server SSLContext, reloading only if the cert changed."""
+    global _SSL_CTX, _SSL_CTX_KEY
+    key = (
+        certfile,
+        keyfile,
+        os.path.getmtime(certfile),
+        os.path.getmtime(keyfile),
+    )
+    if _SSL_CTX is None or _SSL_CTX_KEY != key:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile=certfile, keyfile=keyfile)
+        _SSL_CTX, _SSL_CTX_KEY = ctx, key
+    return _SSL_CTX
+
+
 def load_twitch_token():
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    return load_json(TOKEN_FILE)
 
 
 def save_twitch_token(data):
-    with open(TOKEN_FILE, "w") as f:
-        json.dump(data, f)
+    save_json(TOKEN_FILE, data)
+
+
+class _OAuthCallbackHandler(http.server.BaseHTTPRequestHandler):
+    """Captures the ``code`` from the OAuth redirect into ``server.code_holder``."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        qs = parse_qs(parsed.query)
+        if parsed.path == "/callback" and "code" in qs:
+            self.server.code_holder["code"] = qs["code"][0]
+            self.server.code_received.set()
+            self.send_response(200)
+            self.send_header("Content-type", "text/html")
+            self.end_headers()
+            self.wfile.write(
+                b"<h1>Authorization successful!</h1><p>You may close this window.</p>"
+            )
+        else:
+            self.send_response(400)
+            self.end_headers()
+            self.wfile.write(b"Authorization failed or was cancelled.")
+
+    def log_message(self, *a, **k):
+        pass
+
+
+class _ReusableTCPServer(socketserver.TCPServer):
+    allow_reuse_address = True
 
 
 class TwitchOAuthTokenManager:
@@ -98,39 +150,77 @@ class TwitchOAuthTokenManager:
     def __init__(self, client_id: str, client_secret: str):
         self.client_id = client_id
         self.client_secret = client_secret
-        self.token_data = load_twitch_token()
-        # Serialize access to refresh/authorize to prevent multiple threads
-        # from triggering concurrent OAuth flows.
-        self._lock = threading.Lock()
+        self._set_token_data(load_twitch_token())
+        # Only one thread runs refresh/authorize at a time; the others wait
+        # on the condition and all wake together once it finishes.
+        self._cond = threading.Condition()
+        self._refreshing = False
+
+    def _set_token_data(self, data) -> None:
+        """Store ``data`` and cache its access token and expiry."""
+        self.token_data = data
+        data = data or {}
+        # One tuple so unlocked readers never pair a token with a stale expiry.
+        self._cached = (
+            data.get("access_token"),
+            float(data.get("expires_at", 0) or 0),
+        )
+
+    def _cached_token(self) -> Optional[str]:
+        """Return the stored access token if it is valid for 2+ more minutes."""
+        access_token, expires_at = self._cached
+        if access_token and expires_at > time.time() + 120:
+            return access_token
+        return None
 
     def get_token(self) -> str:
         """
         Get a valid access token, refreshing or authorizing if necessary.
         """
-        with self._lock:
-            vprint(2, f"[OAUTH DEBUG] Loaded token: {self.token_data}")
-            if (
-                self.token_data
-                and self.token_data.get("access_token")
-                and self.token_data.get("expires_at", 0) > time.time() + 120
-            ):
-                vprint(1, "[OAUTH] Using cached token.")
-                return self.token_data["access_token"]
+        # Fast path: a valid cached token needs no lock.
+        token = self._cached_token()
+        if token:
+            vprint(1, "[OAUTH] Using cached token.")
+            return token
 
-            if self.token_data and self.token_data.get("refresh_token"):
-                try:
-                    vprint(1, "[OAUTH] Attempting to refresh token.")
-                    self.refresh_token()
-                    if self.token_data.get("access_token"):
-                        return self.token_data["access_token"]
-                except Exception as e:
-                    print(f"[OAUTH ERROR] Refresh failed: {e}")
+        with self._cond:
+            if vprint_enabled(2):
+                vprint(2, f"[OAUTH DEBUG] Loaded token: {self.token_data}")
+            while True:
+                # Another thread may have refreshed while we waited.
+                token = self._cached_token()
+                if token:
+                    vprint(1, "[OAUTH] Using cached token.")
+                    return token
+                if not self._refreshing:
+                    break
+                # Sleep until the in-progress refresh finishes, then re-check.
+                self._cond.wait_for(lambda: not self._refreshing)
+            self._refreshing = True
 
-            vprint(1, "[OAUTH] No valid token. Starting authorization flow...")
-            self.authorize()
-            if self.token_data and self.token_data.get("access_token"):
-                return self.token_data["access_token"]
-            raise RuntimeError("OAuth failed: No access token obtained!")
+        try:
+            return self._obtain_token()
+        finally:
+            with self._cond:
+                self._refreshing = False
+                self._cond.notify_all()
+
+    def _obtain_token(self) -> str:
+        """Refresh the token, falling back to the browser authorization flow."""
+        if self.token_data and self.token_data.get("refresh_token"):
+            try:
+                vprint(1, "[OAUTH] Attempting to refresh token.")
+                self.refresh_token()
+                if self.token_data.get("access_token"):
+                    return self.token_data["access_token"]
+            except Exception as e:
+                print(f"[OAUTH ERROR] Refresh failed: {e}")
+
+        vprint(1, "[OAUTH] No valid token. Starting authorization flow...")
+        self.authorize()
+        if self.token_data and self.token_data.get("access_token"):
+            return self.token_data["access_token"]
+        raise RuntimeError("OAuth failed: No access token obtained!")
 
     def authorize(self):
         """
@@ -151,36 +241,15 @@ class TwitchOAuthTokenManager:
         )
         webbrowser.open(url)
         code_holder = {}
-
-        class Handler(http.server.BaseHTTPRequestHandler):
-            def do_GET(self):
-                from urllib.parse import urlparse, parse_qs
-
-                parsed = urlparse(self.path)
-                qs = parse_qs(parsed.query)
-                if parsed.path == "/callback" and "code" in qs:
-                    code_holder["code"] = qs["code"][0]
-                    self.send_response(200)
-                    self.send_header("Content-type", "text/html")
-                    self.end_headers()
-                    self.wfile.write(
-                        b"<h1>Authorization successful!</h1><p>You may close this window.</p>"
-                    )
-                else:
-                    self.send_response(400)
-                    self.end_headers()
-                    self.wfile.write(b"Authorization failed or was cancelled.")
-
-            def log_message(self, *a, **k):
-                pass
-
-        class ReusableTCPServer(socketserver.TCPServer):
-            allow_reuse_address = True
+        code_received = threading.Event()
 
         try:
-            with ReusableTCPServer(("localhost", 8443), Handler) as httpd:
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-                ssl_context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+            with _ReusableTCPServer(
+                ("localhost", 8443), _OAuthCallbackHandler
+            ) as httpd:
+                httpd.code_holder = code_holder
+                httpd.code_received = code_received
+                ssl_context = _get_ssl_context(certfile, keyfile)
                 httpd.socket = ssl_context.wrap_socket(httpd.socket, server_side=True)
                 t = threading.Thread(target=httpd.serve_forever)
                 t.daemon = True
@@ -189,10 +258,7 @@ class TwitchOAuthTokenManager:
                     1,
                     "[OAUTH] Waiting for browser callback on https://localhost:8443/callback ...",
                 )
-                for _ in range(300):
-                    if "code" in code_holder:
-                        break
-                    time.sleep(1)
+                code_received.wait(timeout=300)
                 httpd.shutdown()
         except Exception as e:
             vprint(1, f"[OAUTH] Local callback server error: {e}")
@@ -206,8 +272,8 @@ class TwitchOAuthTokenManager:
             manual_url = input("Paste redirect URL (or press Enter to abort): ").strip()
             if manual_url:
                 try:
-                    parsed = urllib.parse.urlparse(manual_url)
-                    qs = urllib.parse.parse_qs(parsed.query)
+                    parsed = urlparse(manual_url)
+                    qs = parse_qs(parsed.query)
                     if "code" in qs:
                         code_holder["code"] = qs["code"][0]
                 except Exception:
@@ -215,8 +281,6 @@ class TwitchOAuthTokenManager:
         if "code" not in code_holder:
             raise RuntimeError("OAuth failed: Did not receive code.")
         vprint(1, "[OAUTH] Received code. Requesting token...")
-        import requests
-
         data = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -224,18 +288,20 @@ class TwitchOAuthTokenManager:
             "grant_type": "authorization_code",
             "redirect_uri": self.REDIRECT_URI,
         }
-        resp = requests.post(self.TOKEN_URL, data=data)
+        resp = _token_session.post(self.TOKEN_URL, data=data, timeout=10)
         try:
             resp.raise_for_status()
         except Exception as e:
             print(f"[OAUTH ERROR] Token request failed: {resp.text}")
             raise
         token_json = resp.json()
-        self.token_data = {
-            "access_token": token_json["access_token"],
-            "refresh_token": token_json.get("refresh_token"),
-            "expires_at": time.time() + token_json.get("expires_in", 0),
-        }
+        self._set_token_data(
+            {
+                "access_token": token_json["access_token"],
+                "refresh_token": token_json.get("refresh_token"),
+                "expires_at": time.time() + token_json.get("expires_in", 0),
+            }
+        )
         save_twitch_token(self.token_data)
         vprint(1, "[OAUTH] Token obtained and saved.")
 
@@ -244,23 +310,22 @@ class TwitchOAuthTokenManager:
         Uses the refresh_token to obtain a new access token.
         """
         vprint(1, "[OAUTH] Refreshing token...")
-        import requests
-
         data = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
             "grant_type": "refresh_token",
             "refresh_token": self.token_data["refresh_token"],
         }
-        resp = requests.post(self.TOKEN_URL, data=data)
+        resp = _token_session.post(self.TOKEN_URL, data=data, timeout=10)
         try:
             resp.raise_for_status()
         except Exception as e:
             print(f"[OAUTH ERROR] Refresh request failed: {resp.text}")
             raise
         token_json = resp.json()
-        self.token_data.update(
+        self._set_token_data(
             {
+                **self.token_data,
                 "access_token": token_json["access_token"],
                 "refresh_token": token_json.get(
                     "refresh_token", self.token_data.get("refresh_token")
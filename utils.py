@@ -1,18 +1,48 @@
+import copy
 import json
+import logging
 import os
+import queue
 import sys
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 import yaml
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional at runtime
+    orjson = None
+
+try:
+    _YAML_LOADER = yaml.CSafeLoader
+except AttributeError:  # pragma: no cover - PyYAML built without libyaml
+    _YAML_LOADER = yaml.SafeLoader
+
+
+# Reused by save_json when orjson is unavailable.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
 
 def save_json(filepath, data):
     """
     Save a Python object to a JSON file, pretty-printed and UTF-8 encoded.
+    The data is written to a temporary file and swapped in with
+    ``os.replace`` so a crash never leaves a truncated file behind.
     """
     tmpfile = filepath + ".tmp"
-    with open(tmpfile, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = _JSON_ENCODER.encode(data).encode("utf-8")
+    # Buffered binary handle: write() loops over short writes and flush()
+    # pushes everything out before the fsync.
+    with open(tmpfile, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
     os.replace(tmpfile, filepath)
 
 
@@ -21,17 +51,21 @@ def load_json(filepath):
     Load a JSON file and return its contents as a Python object.
     Returns {} if file does not exist.
     """
-    if not os.path.exists(filepath):
+    try:
+        with open(filepath, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
         return {}
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
 def now_iso():
     """
     Returns the current UTC time in ISO8601 format.
     """
-    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 
 def safe_makedirs(path):
@@ -41,12 +75,21 @@ def safe_makedirs(path):
     os.makedirs(path, exist_ok=True)
 
 
-def truncate(s, length=100):
+def truncate(s, length=100, _ellipsis="..."):
     """
     Truncates a string to at most 'length' characters, adding '...' if cut.
     """
-    s = str(s)
-    return s if len(s) <= length else s[: length - 3] + "..."
+    if type(s) is not str:
+        s = str(s)
+    return s if len(s) <= length else s[: length - 3] + _ellipsis
+
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=256)
+def _split_path(path: str) -> tuple:
+    return tuple(path.split("."))
 
 
 def get_config_value(config, path, default=None):
@@ -54,12 +97,13 @@ def get_config_value(config, path, default=None):
     Safely get a value from a nested config dictionary using dot-notation path.
     Example: get_config_value(cfg, 'twitch.nickname', 'guest')
     """
-    keys = path.split(".")
     v = config
-    for k in keys:
-        if isinstance(v, dict) and k in v:
-            v = v[k]
-        else:
+    for k in _split_path(path):
+        try:
+            v = v.get(k, _MISSING)
+        except AttributeError:  # hit a non-dict before the path ended
+            return default
+        if v is _MISSING:
             return default
     return v
 
@@ -80,38 +124,249 @@ def set_verbosity(level: int) -> None:
         VERBOSITY = 0
 
 
+def vprint_enabled(level: int) -> bool:
+    """Return True if ``vprint(level, ...)`` would print.
+
+    Guard expensive f-strings with this so they are not built when quiet.
+    """
+    return VERBOSITY >= level
+
+
 def vprint(level: int, message: str) -> None:
     """Print ``message`` if ``VERBOSITY`` >= ``level``."""
     if VERBOSITY >= level:
         print(message)
 
 
+# Parsed config keyed by (absolute path, mtime_ns) of the file it came from.
+_CONFIG_CACHE = {}
+
+
 def load_config(path: str = "config.yaml"):
     """Load YAML configuration from ``path`` or exit if missing."""
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
         print("Missing config.yaml! Exiting.")
         sys.exit(1)
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    key = (os.path.abspath(path), st.st_mtime_ns)
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.load(f, Loader=_YAML_LOADER)
+        _CONFIG_CACHE.clear()
+        _CONFIG_CACHE[key] = config
+    # Callers may mutate the result; keep the cached parse pristine.
+    return copy.deepcopy(config)
+
+
+@dataclass(frozen=True, slots=True)
+class BotConfig:
+    """Typed view of ``config.yaml`` built once at startup."""
+
+    api_key: str
+    assistant_id: str
+    channel: str
+    client_id: str
+    client_secret: str
+    batch_interval: float = 2
+    tokens_per_minute: int = 20000
+    moderation_timeout: float = 60
+    max_openai_content_size: int = 256000
+    max_rate_limit_retries: int = 3
+    max_concurrent_batches: int = 8
+    use_stream: bool = False
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "BotConfig":
+        """Build a ``BotConfig`` from the parsed YAML dictionary."""
+        twitch = config["twitch"]
+        return cls(
+            api_key=config["api_key"],
+            assistant_id=config["assistant_id"],
+            channel=twitch["channel"],
+            client_id=twitch["client_id"],
+            client_secret=twitch["client_secret"],
+            batch_interval=config.get("batch_interval", 2),
+            tokens_per_minute=config.get("tokens_per_minute", 20000),
+            moderation_timeout=config.get("moderation_timeout", 60),
+            max_openai_content_size=config.get("max_openai_content_size", 256000),
+            max_rate_limit_retries=config.get("max_rate_limit_retries", 3),
+            max_concurrent_batches=config.get("max_concurrent_batches", 8),
+            use_stream=config.get("use_stream", False),
+        )
+
+
+class DaemonThreadPool:
+    """Minimal ``submit``/``map``/``shutdown`` executor on daemon threads.
+
+    ``concurrent.futures.ThreadPoolExecutor`` joins its workers at
+    interpreter exit, so one call stuck on a slow HTTP request keeps the
+    process alive after ``main()`` returns. These workers are plain daemon
+    threads that exit does not wait for. Threads are started lazily, up to
+    ``max_workers``, and reused.
+    """
 
+    def __init__(self, max_workers: int, thread_name_prefix: str = "worker"):
+        self.max_workers = max(1, int(max_workers))
+        self._prefix = thread_name_prefix
+        self._work = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
 
-def run_with_timeout(func, args=(), kwargs=None, timeout: int = 60):
-    """Run ``func`` with ``timeout`` seconds limit in a helper thread."""
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._work.put((future, fn, args, kwargs))
+            # Start a thread only if none is idle, mirroring ThreadPoolExecutor.
+            if (
+                not self._idle.acquire(blocking=False)
+                and len(self._threads) < self.max_workers
+            ):
+                t = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"{self._prefix}_{len(self._threads)}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+        return future
+
+    def map(self, fn, *iterables):
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return (future.result() for future in futures)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._work.put(None)
+        if wait:
+            for t in threads:
+                t.join()
+
+    def _worker_loop(self):
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            del item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            del future
+            self._idle.release()
+
+
+# Default helper threads for run_with_timeout. Callers with their own
+# concurrency limit should pass a pool sized to it instead.
+_TIMEOUT_POOL = DaemonThreadPool(max_workers=8, thread_name_prefix="timeout")
+
+
+def run_with_timeout(
+    func, args=(), kwargs=None, timeout: int = 60, cancel_event=None, pool=None
+):
+    """Run ``func`` with ``timeout`` seconds limit in a helper thread of ``pool``.
+
+    ``timeout`` is a single deadline covering both the wait for a free worker
+    and the call itself. A call that misses it keeps running in the
+    background and holds its worker until it returns, so ``pool`` (default
+    ``_TIMEOUT_POOL``) also bounds how many abandoned calls can pile up.
+
+    ``cancel_event``, if given, is set when the deadline passes after ``func``
+    has started. ``func`` should check it before any side effect that must
+    not happen once the caller has given up on the result.
+    """
     if kwargs is None:
         kwargs = {}
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        try:
-            future = executor.submit(func, *args, **kwargs)
-        except RuntimeError as e:
-            print(f"[ERROR][THREADPOOL] {e}")
-            return False
+    if pool is None:
+        pool = _TIMEOUT_POOL
+    name = getattr(func, "__name__", str(func))
+    deadline = time.monotonic() + timeout
+    started = threading.Event()
+
+    def _call():
+        started.set()
+        return func(*args, **kwargs)
+
+    try:
+        future = pool.submit(_call)
+    except RuntimeError as e:
+        print(f"[ERROR][THREADPOOL] {e}")
+        return False
+    if not started.wait(timeout) and future.cancel():
+        print(f"[TIMEOUT] Function {name} did not start within {timeout}s")
+        return False
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        if cancel_event is not None:
+            cancel_event.set()
+        print(f"[TIMEOUT] Function {name} exceeded {timeout}s")
+        return False
+    except BaseException as e:
+        print(f"[ERROR][THREAD] {e}")
+        return False
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """``FileHandler`` that buffers writes and flushes on a timer.
+
+    Records are written into a large file buffer instead of being flushed
+    one by one; a daemon thread flushes every ``flush_interval`` seconds and
+    :meth:`close` flushes whatever is left.
+    """
+
+    def __init__(
+        self,
+        filename,
+        mode: str = "a",
+        encoding=None,
+        buffer_size: int = 65536,
+        flush_interval: float = 1.0,
+    ):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        super().__init__(filename, mode, encoding)
+        self._stop_flush = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def flush(self):
+        """Skip per-record flushes; the timer thread flushes instead."""
+
+    def _flush_loop(self):
+        while not self._stop_flush.wait(self.flush_interval):
+            self._real_flush()
+
+    def _real_flush(self):
+        self.acquire()
         try:
-            return future.result(timeout=timeout)
-        except FuturesTimeoutError:
-            print(
-                f"[TIMEOUT] Function {getattr(func, '__name__', str(func))} exceeded {timeout}s"
-            )
-            return False
-        except BaseException as e:
-            print(f"[ERROR][THREAD] {e}")
-            return False
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self._stop_flush.set()
+        self._real_flush()
+        super().close()